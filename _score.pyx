@@ -0,0 +1,34 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Kernel di scoring compilato AOT per main._score_batch (nessun warm-up JIT).
+Build: cythonize -i _score.pyx
+"""
+from libc.math cimport exp
+
+cdef inline double _implied_prob(double odds, double odds_other) nogil:
+    cdef double i = 1.0 / odds if odds > 1.0 else 0.0
+    cdef double io = 1.0 / odds_other if odds_other > 1.0 else 0.0
+    cdef double s = i + io
+    return i / s if s > 0.0 else 0.5
+
+cdef inline double _value_score(double prob, double odds) nogil:
+    if odds <= 1.0: return 0.0
+    return 1.0 / (1.0 + exp(-(prob * (odds - 1) - (1 - prob)) * 4))
+
+cdef inline double _odds_penalty(double odds) nogil:
+    return (0.1 * (odds < 1.3) + 0.05 * (odds > 5.0)) * (odds != 0.0)
+
+cpdef tuple score_arrays(const double[:] oh, const double[:] oa, const double[:] lw):
+    cdef Py_ssize_t i, n = oh.shape[0]
+    cdef double ph_prob, pa_prob, ph, pa, vh, va, p, v
+    cdef bint away
+    cdef list SIDE = [], P = [], V = [], C = [], PEN = []
+    for i in range(n):
+        ph_prob = _implied_prob(oh[i], oa[i]); pa_prob = _implied_prob(oa[i], oh[i])
+        ph = 0.6*ph_prob + 0.3*0.5 + 0.1*lw[i]
+        pa = 0.6*pa_prob + 0.3*0.5 + 0.1*(1 - lw[i])
+        vh = _value_score(ph, oh[i]); va = _value_score(pa, oa[i])
+        away = va > vh
+        p = pa if away else ph; v = va if away else vh
+        SIDE.append(1.0 if away else 0.0); P.append(p); V.append(v); C.append(0.5*p + 0.5*v); PEN.append(_odds_penalty(oa[i] if away else oh[i]))
+    return SIDE, P, V, C, PEN
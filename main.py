@@ -3,48 +3,119 @@
 ai-sports-autobet - Agente AI autonomo per pronostici sportivi
 """
 import os
+import re
+import math
+import time
+import heapq
+import functools
+import asyncio
 import logging
-from datetime import datetime, date
-from typing import List, Dict, Any
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import List, Dict, Any, Tuple, NamedTuple, Callable, Iterable, cast
+import ijson
+import orjson
 import requests
-from telegram import Bot
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import numpy as np
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # senza numba gli helper restano Python puro e score_kernel usa la variante NumPy vettoriale
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        return args[0] if len(args) == 1 and callable(args[0]) and not kwargs else (lambda f: f)
+try:
+    from _score import score_arrays as _score_arrays_aot  # estensione Cython opzionale (cythonize -i _score.pyx)
+except ImportError:
+    _score_arrays_aot = None
 
 API_FOOTBALL_KEY = os.getenv('API_FOOTBALL_KEY', 'YOUR_API_FOOTBALL_KEY_HERE')
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_TELEGRAM_BOT_TOKEN_HERE')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'YOUR_TELEGRAM_CHAT_ID_HERE')
+TELEGRAM_API_URL = 'https://api.telegram.org'
 
 API_FOOTBALL_BASE_URL = 'https://v3.football.api-sports.io'
 API_BASKET_BASE_URL = 'https://v1.basketball.api-sports.io'
 API_VOLLEY_BASE_URL = 'https://v1.volleyball.api-sports.io'
-API_SPORTS_HEADERS = {'x-apisports-key': API_FOOTBALL_KEY}
+CACHE_DIR = Path(os.getenv('AUTOBET_CACHE_DIR', Path.home() / '.cache' / 'ai-sports-autobet'))
+FORCE_REFRESH = os.getenv('AUTOBET_FORCE_REFRESH', '').lower() in ('1', 'true', 'yes')
+API_SPORTS_HEADERS = {'x-apisports-key': API_FOOTBALL_KEY, 'Accept-Encoding': 'gzip'}
+
+# sessione condivisa: keep-alive e pool di connessioni riusati tra le chiamate dei vari sport.
+# gli header API-Sports vanno passati per richiesta: la stessa sessione invia anche a Telegram
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# peso lega per nome esatto, es. AUTOBET_LEAGUE_BOOSTS='{"Serie A": 0.6}'; le altre leghe usano _TOP_LEAGUE_RE
+def _load_league_boosts(raw: str) -> Dict[str, float]:
+    try: boosts = orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        logger.warning(f"AUTOBET_LEAGUE_BOOSTS non e' JSON valido ({e}): uso i pesi predefiniti"); return {}
+    if not isinstance(boosts, dict) or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in boosts.values()):
+        logger.warning("AUTOBET_LEAGUE_BOOSTS deve essere un oggetto {lega: peso numerico}: uso i pesi predefiniti"); return {}
+    return {k: float(v) for k, v in boosts.items()}
+
+LEAGUE_BOOSTS: Dict[str, float] = _load_league_boosts(os.getenv('AUTOBET_LEAGUE_BOOSTS', '{}'))
+
+# cache su disco per (sport, data): le riesecuzioni dello stesso giorno non ripetono le chiamate API
+def disk_cache(sport: str, ttl: int = 3600):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(date_str: str) -> List[Dict[str, Any]]:
+            path = CACHE_DIR / f"{sport}_{date_str}.json"
+            if not FORCE_REFRESH:
+                try:
+                    if time.time() - path.stat().st_mtime < ttl:
+                        res = orjson.loads(path.read_bytes()); logger.info(f"Eventi {sport} per {date_str} letti dalla cache"); return res
+                except (OSError, ValueError): pass
+            res = fn(date_str)
+            if res:  # una lista vuota puo' essere un errore di rete: non va memorizzata
+                try:
+                    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                    for old in CACHE_DIR.glob(f"{sport}_*.json"):
+                        if old != path: old.unlink(missing_ok=True)
+                    tmp = path.with_suffix('.tmp'); tmp.write_bytes(orjson.dumps(res)); tmp.replace(path)
+                except OSError as e:
+                    logger.warning(f"Impossibile scrivere la cache {sport}: {e}")
+            return res
+        return wrapper
+    return deco
+
+@disk_cache('football')
 def fetch_football_matches(date_str: str) -> List[Dict[str, Any]]:
     try:
-        r = requests.get(f'{API_FOOTBALL_BASE_URL}/fixtures', headers=API_SPORTS_HEADERS, params={'date': date_str}, timeout=15)
-        r.raise_for_status(); return r.json().get('response', [])
+        # payload piu' grande (anche >1 MB): parsing in streaming dei soli fixture, senza materializzare l'intera risposta
+        with SESSION.get(f'{API_FOOTBALL_BASE_URL}/fixtures', headers=API_SPORTS_HEADERS, params={'date': date_str}, stream=True, timeout=15) as r:
+            r.raise_for_status(); r.raw.decode_content = True
+            return list(ijson.items(r.raw, 'response.item', use_float=True))
     except Exception as e:
         logger.error(f"Errore nel recupero partite calcio: {e}"); return []
 
+@disk_cache('basketball')
 def fetch_basketball_games(date_str: str) -> List[Dict[str, Any]]:
     try:
-        r = requests.get(f'{API_BASKET_BASE_URL}/games', headers=API_SPORTS_HEADERS, params={'date': date_str}, timeout=15)
-        r.raise_for_status(); return r.json().get('response', [])
+        r = SESSION.get(f'{API_BASKET_BASE_URL}/games', headers=API_SPORTS_HEADERS, params={'date': date_str}, timeout=15)
+        r.raise_for_status(); return orjson.loads(r.content).get('response', [])
     except Exception as e:
         logger.error(f"Errore nel recupero partite basket: {e}"); return []
 
 def fetch_tennis_matches(date_str: str) -> List[Dict[str, Any]]:
     logger.info(f"Recupero partite tennis per {date_str} - PLACEHOLDER"); return []
 
+@disk_cache('volleyball')
 def fetch_volleyball_matches(date_str: str) -> List[Dict[str, Any]]:
     try:
-        r = requests.get(f'{API_VOLLEY_BASE_URL}/games', headers=API_SPORTS_HEADERS, params={'date': date_str}, timeout=15)
-        r.raise_for_status(); return r.json().get('response', [])
+        r = SESSION.get(f'{API_VOLLEY_BASE_URL}/games', headers=API_SPORTS_HEADERS, params={'date': date_str}, timeout=15)
+        r.raise_for_status(); return orjson.loads(r.content).get('response', [])
     except Exception as e:
         logger.error(f"Errore nel recupero partite volley: {e}"); return []
 
@@ -59,127 +130,222 @@ def safe_get(d: Dict[str, Any], path: List[Any], default=None):
             else: return default
     return cur
 
-def compute_moneyline_probs(odds_home: float | None, odds_away: float | None) -> Dict[str, float]:
-    probs = {'home': 0.5, 'away': 0.5}
-    vals = {}
-    if odds_home and odds_home > 1.0: vals['home'] = 1.0 / odds_home
-    if odds_away and odds_away > 1.0: vals['away'] = 1.0 / odds_away
-    if vals:
-        s = sum(vals.values()); probs = {k: v / s for k, v in vals.items()}
-        if 'home' not in probs: probs['home'] = 1 - probs.get('away', 0.5)
-        if 'away' not in probs: probs['away'] = 1 - probs.get('home', 0.5)
-    return probs
-
-def value_score(prob: float, odds: float | None) -> float:
-    if not odds or odds <= 1.0: return 0.0
+# equivale a softmax(-log(quote)) sulle quote valide, ma in forma chiusa: 1/quota sta in (0, 1), quindi
+# non c'e' rischio di overflow e la forma log/exp aggiungerebbe solo costo ed errori di arrotondamento
+@njit(cache=True)
+def compute_moneyline_probs(odds_home: float, odds_away: float) -> Tuple[float, float]:
+    ih = 1.0 / odds_home if odds_home > 1.0 else 0.0
+    ia = 1.0 / odds_away if odds_away > 1.0 else 0.0
+    s = ih + ia
+    if s > 0.0:
+        return ih / s, ia / s
+    return 0.5, 0.5
+
+@njit(cache=True)
+def value_score(prob: float, odds: float) -> float:
+    if odds <= 1.0: return 0.0
     ev = prob * (odds - 1) - (1 - prob)
-    return float(1 / (1 + np.exp(-ev * 4)))
-
-def build_event_candidates(dati: Dict[str, Any]) -> List[Dict[str, Any]]:
-    cands: List[Dict[str, Any]] = []
-    for fx in dati.get('football', []) or []:
-        league = safe_get(fx, ['league','name'], '')
-        home = safe_get(fx, ['teams','home','name'], 'Home')
-        away = safe_get(fx, ['teams','away','name'], 'Away')
-        t = safe_get(fx, ['fixture','date'], None)
-        oh = safe_get(fx, ['odds','bookmakers',0,'bets',0,'values',0,'odd'], None)
-        oa = safe_get(fx, ['odds','bookmakers',0,'bets',0,'values',1,'odd'], None)
-        try: oh = float(oh) if oh else None; oa = float(oa) if oa else None
-        except Exception: oh, oa = None, None
-        probs = compute_moneyline_probs(oh, oa)
-        home_form = away_form = 0.5
-        lw = 0.55 if ('Serie' in league or 'Premier' in league) else 0.5
-        ph = 0.6*probs['home'] + 0.3*home_form + 0.1*lw
-        pa = 0.6*probs['away'] + 0.3*away_form + 0.1*(1-lw)
-        vh, va = value_score(ph, oh), value_score(pa, oa)
-        if vh >= va:
-            cands.append({'sport':'football','market':'1X2','pick':'1','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oh,'prob':round(ph,3),'confidence':round(0.5*ph+0.5*vh,3),'rationale':f"Prob./contesto favorevoli a {home}. Value={vh:.2f}"})
-        else:
-            cands.append({'sport':'football','market':'1X2','pick':'2','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oa,'prob':round(pa,3),'confidence':round(0.5*pa+0.5*va,3),'rationale':f"Miglior value su {away}. Value={va:.2f}"})
-    for bx in dati.get('basketball', []) or []:
-        league = safe_get(bx, ['league','name'], '')
-        home = safe_get(bx, ['teams','home','name'], 'Home')
-        away = safe_get(bx, ['teams','away','name'], 'Away')
-        t = safe_get(bx, ['date'], None) or safe_get(bx, ['game','date'], None)
-        oh = safe_get(bx, ['odds','bookmakers',0,'bets',0,'values',0,'odd'], None)
-        oa = safe_get(bx, ['odds','bookmakers',0,'bets',0,'values',1,'odd'], None)
-        try: oh = float(oh) if oh else None; oa = float(oa) if oa else None
-        except Exception: oh, oa = None, None
-        probs = compute_moneyline_probs(oh, oa)
-        ph = 0.6*probs['home'] + 0.3*0.5 + 0.1*0.5
-        pa = 0.6*probs['away'] + 0.3*0.5 + 0.1*0.5
-        vh, va = value_score(ph, oh), value_score(pa, oa)
-        if vh >= va:
-            cands.append({'sport':'basketball','market':'ML','pick':'Home','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oh,'prob':round(ph,3),'confidence':round(0.5*ph+0.5*vh,3),'rationale':f"Moneyline favorevole a {home}. Value={vh:.2f}"})
-        else:
-            cands.append({'sport':'basketball','market':'ML','pick':'Away','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oa,'prob':round(pa,3),'confidence':round(0.5*pa+0.5*va,3),'rationale':f"Moneyline favorevole a {away}. Value={va:.2f}"})
-    for vx in dati.get('volleyball', []) or []:
-        league = safe_get(vx, ['league','name'], '')
-        home = safe_get(vx, ['teams','home','name'], 'Home')
-        away = safe_get(vx, ['teams','away','name'], 'Away')
-        t = safe_get(vx, ['date'], None)
-        oh = safe_get(vx, ['odds','bookmakers',0,'bets',0,'values',0,'odd'], None)
-        oa = safe_get(vx, ['odds','bookmakers',0,'bets',0,'values',1,'odd'], None)
-        try: oh = float(oh) if oh else None; oa = float(oa) if oa else None
-        except Exception: oh, oa = None, None
-        probs = compute_moneyline_probs(oh, oa)
-        ph = 0.6*probs['home'] + 0.3*0.5 + 0.1*0.5
-        pa = 0.6*probs['away'] + 0.3*0.5 + 0.1*0.5
-        vh, va = value_score(ph, oh), value_score(pa, oa)
-        if vh >= va:
-            cands.append({'sport':'volleyball','market':'ML','pick':'Home','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oh,'prob':round(ph,3),'confidence':round(0.5*ph+0.5*vh,3),'rationale':f"Favorita squadra di casa. Value={vh:.2f}"})
-        else:
-            cands.append({'sport':'volleyball','market':'ML','pick':'Away','event':f"{home} vs {away}", 'league':league,'start':t,'odds':oa,'prob':round(pa,3),'confidence':round(0.5*pa+0.5*va,3),'rationale':f"Favorita squadra ospite. Value={va:.2f}"})
-    return cands
+    return 1.0 / (1.0 + math.exp(-ev * 4))
+
+@njit(cache=True)
+def odds_penalty(odds: float) -> float:
+    # -0.1 sotto 1.3, -0.05 sopra 5.0, nulla se la quota manca (0.0): forma aritmetica senza rami
+    return (0.1 * (odds < 1.3) + 0.05 * (odds > 5.0)) * (odds != 0.0)
+
+# kernel unico: per ogni evento calcola entrambi i lati e seleziona quello con value migliore (casa a parita'),
+# restituendo lato scelto (0 casa, 1 ospite), probabilita', value, confidenza e penalita' quota di quel lato.
+# la firma esplicita lo compila (con gli helper) all'import, cosi' il primo processo_giornaliero non paga il JIT.
+# niente fastmath: FMA/riassociazioni spostano l'ultimo bit e cambiano gli arrotondamenti a 3 decimali
+@njit('float64[:, :](float64[:], float64[:], float64[:])', cache=True)
+def _score_kernel_jit(oh: np.ndarray, oa: np.ndarray, lw: np.ndarray) -> np.ndarray:
+    n = oh.shape[0]; out = np.empty((5, n))
+    for i in range(n):
+        ph_prob, pa_prob = compute_moneyline_probs(oh[i], oa[i])
+        ph = 0.6*ph_prob + 0.3*0.5 + 0.1*lw[i]
+        pa = 0.6*pa_prob + 0.3*0.5 + 0.1*(1 - lw[i])
+        vh = value_score(ph, oh[i]); va = value_score(pa, oa[i])
+        away = va > vh
+        p = pa if away else ph; v = va if away else vh
+        out[0, i] = away; out[1, i] = p; out[2, i] = v; out[3, i] = 0.5*p + 0.5*v; out[4, i] = odds_penalty(oa[i] if away else oh[i])
+    return out
+
+def _score_kernel_numpy(oh: np.ndarray, oa: np.ndarray, lw: np.ndarray) -> np.ndarray:
+    # stessa uscita di _score_kernel_jit, colonna per colonna con operazioni vettoriali
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ih = np.where(oh > 1.0, 1.0 / oh, 0.0); ia = np.where(oa > 1.0, 1.0 / oa, 0.0); s = ih + ia
+        ph_prob = np.where(s > 0.0, ih / s, 0.5); pa_prob = np.where(s > 0.0, ia / s, 0.5)
+    ph = 0.6*ph_prob + 0.3*0.5 + 0.1*lw
+    pa = 0.6*pa_prob + 0.3*0.5 + 0.1*(1 - lw)
+    vh = np.where(oh > 1.0, 1.0 / (1.0 + np.exp(-(ph * (oh - 1) - (1 - ph)) * 4)), 0.0)
+    va = np.where(oa > 1.0, 1.0 / (1.0 + np.exp(-(pa * (oa - 1) - (1 - pa)) * 4)), 0.0)
+    away = va > vh
+    p, v, o = np.where(away, pa, ph), np.where(away, va, vh), np.where(away, oa, oh)
+    return np.stack((away.astype(np.float64), p, v, 0.5*p + 0.5*v, (0.1 * (o < 1.3) + 0.05 * (o > 5.0)) * (o != 0.0)))
+
+score_kernel = _score_kernel_jit if HAVE_NUMBA else _score_kernel_numpy
+if HAVE_NUMBA:
+    # anche con la firma esplicita la prima chiamata paga ~10 ms di setup del dispatcher: lo si sposta all'import
+    score_kernel(np.zeros(1), np.zeros(1), np.zeros(1))
+
+# accessori a percorso fisso per i campi letti per ogni evento: evitano il ciclo generico di safe_get
+def _get_odds_values(ev: Dict[str, Any]) -> Any:
+    try: return ev['odds']['bookmakers'][0]['bets'][0]['values']
+    except (KeyError, IndexError, TypeError): return None
+
+def _get_odd(values: Any, idx: int) -> Any:
+    try: return values[idx]['odd']
+    except (KeyError, IndexError, TypeError): return None
+
+def _get_team(ev: Dict[str, Any], side: str, default: str) -> Any:
+    try: return ev['teams'][side]['name']
+    except (KeyError, IndexError, TypeError): return default
+
+def _get_league(ev: Dict[str, Any]) -> Any:
+    try: return ev['league']['name']
+    except (KeyError, IndexError, TypeError): return ''
+
+def _get_fixture_date(ev: Dict[str, Any]) -> Any:
+    try: return ev['fixture']['date']
+    except (KeyError, IndexError, TypeError): return None
 
-def raccolta_dati() -> Dict[str, Any]:
+def _get_date(ev: Dict[str, Any]) -> Any:
+    try: return ev['date']
+    except (KeyError, IndexError, TypeError): return None
+
+def _get_game_date(ev: Dict[str, Any]) -> Any:
+    try: return ev['game']['date']
+    except (KeyError, IndexError, TypeError): return None
+
+def _parse_odds(ev: Dict[str, Any]) -> Tuple[float | None, float | None]:
+    values = _get_odds_values(ev)  # percorso comune alle due quote: attraversato una volta sola
+    oh, oa = _get_odd(values, 0), _get_odd(values, 1)
+    try: return (float(oh) if oh else None), (float(oa) if oa else None)
+    except (TypeError, ValueError): return None, None
+
+def _score_arrays(oh: np.ndarray, oa: np.ndarray, lw: np.ndarray) -> Tuple[List[float], ...]:
+    return tuple(score_kernel(oh, oa, lw).tolist())  # stessa forma della tupla restituita da score_arrays in Cython
+
+def _score_batch(odds: List[Tuple[float | None, float | None]], lw: np.ndarray) -> Tuple[List[float], ...]:
+    # colonne SoA (quota mancante -> 0.0, cioe' non valida): un solo passaggio vettoriale per sport invece di N chiamate scalari
+    oh = np.array([o[0] or 0.0 for o in odds], dtype=np.float64); oa = np.array([o[1] or 0.0 for o in odds], dtype=np.float64)
+    return (_score_arrays_aot or _score_arrays)(oh, oa, lw)
+
+_TOP_LEAGUE_RE = re.compile(r'Serie|Premier').search
+
+@functools.lru_cache(maxsize=None)  # poche leghe distinte per giornata, ripetute su molti eventi: lookup O(1) dopo il primo
+def _football_league_weight(league: str) -> float:
+    w = LEAGUE_BOOSTS.get(league)
+    return w if w is not None else (0.55 if _TOP_LEAGUE_RE(league or '') else 0.5)
+
+class SportCfg(NamedTuple):
+    sport: str
+    market: str
+    picks: Tuple[str, str]
+    start: Callable[[Dict[str, Any]], Any]
+    league_weight: Callable[[str], float]
+    rationale: Tuple[str, str]  # template str.format con campi {home}, {away}, {value}
+
+SPORT_CFG: Tuple[SportCfg, ...] = (
+    SportCfg('football', '1X2', ('1', '2'), _get_fixture_date, _football_league_weight,
+             ("Prob./contesto favorevoli a {home}. Value={value:.2f}", "Miglior value su {away}. Value={value:.2f}")),
+    SportCfg('basketball', 'ML', ('Home', 'Away'), lambda ev: _get_date(ev) or _get_game_date(ev), lambda l: 0.5,
+             ("Moneyline favorevole a {home}. Value={value:.2f}", "Moneyline favorevole a {away}. Value={value:.2f}")),
+    SportCfg('volleyball', 'ML', ('Home', 'Away'), _get_date, lambda l: 0.5,
+             ("Favorita squadra di casa. Value={value:.2f}", "Favorita squadra ospite. Value={value:.2f}")),
+)
+
+@dataclass(slots=True)
+class Candidate:
+    sport: str
+    market: str
+    pick: str
+    event: str
+    league: str
+    start: str | None
+    odds: float | None
+    prob: float
+    confidence: float
+    rationale: str
+
+Row = Tuple[Dict[str, Any], Any, Tuple[float | None, float | None], float, float, float, float, float]
+
+def _emit_candidates(cands: List[Candidate | None], pos: int, rows: Iterable[Row], cfg: SportCfg) -> None:
+    sport, market, picks, start, _, (rat_h, rat_a) = cfg
+    # nomi usati a ogni evento legati a variabili locali: niente LOAD_GLOBAL/lookup di attributi nel ciclo
+    get_team, rnd, mx, fmts = _get_team, round, max, (rat_h.format, rat_a.format)
+    for i, (ev, league, odds, side_f, p, v, c, pen) in enumerate(rows, pos):
+        # il lato e' gia' scelto dal kernel: pick, quota e motivazione si leggono per indice, senza rami
+        side = int(side_f); home, away, t = get_team(ev, 'home', 'Home'), get_team(ev, 'away', 'Away'), start(ev)
+        cands[i] = Candidate(sport, market, picks[side], f"{home} vs {away}", league, t, odds[side], rnd(p,3), rnd(mx(0.0, rnd(c,3) - pen),3), fmts[side](home=home, away=away, value=v))
+
+def build_event_candidates(dati: Dict[str, Any]) -> List[Candidate]:
+    groups = [(cfg, dati.get(cfg.sport, []) or []) for cfg in SPORT_CFG]
+    events = [ev for _, evs in groups for ev in evs]
+    leagues: List[Any] = []; lw: List[float] = []
+    for cfg, evs in groups:
+        ls = [_get_league(ev) for ev in evs]; leagues += ls; lw += map(cfg.league_weight, ls)
+    odds = [_parse_odds(ev) for ev in events]
+    # un'unica passata del kernel su tutti gli sport, poi le righe vengono consumate a blocchi di sport
+    rows = zip(events, leagues, odds, *_score_batch(odds, np.array(lw, dtype=np.float64)))
+    # il numero di candidati e' noto (uno per evento): lista allocata una volta e riempita per indice
+    cands: List[Candidate | None] = [None] * len(events); pos = 0
+    for cfg, evs in groups:
+        _emit_candidates(cands, pos, islice(rows, len(evs)), cfg); pos += len(evs)
+    return cast(List[Candidate], cands)  # ogni slot e' stato riempito: un candidato per evento
+
+FETCHERS: Tuple[Tuple[str, Callable[[str], List[Dict[str, Any]]]], ...] = (
+    ('football', fetch_football_matches), ('basketball', fetch_basketball_games), ('tennis', fetch_tennis_matches), ('volleyball', fetch_volleyball_matches))
+
+async def raccolta_dati() -> Dict[str, Any]:
     today = date.today().isoformat()
     logger.info(f"Recupero eventi per la data: {today}")
-    eventi = {'football': fetch_football_matches(today), 'basketball': fetch_basketball_games(today), 'tennis': fetch_tennis_matches(today), 'volleyball': fetch_volleyball_matches(today), 'data_raccolta': today}
-    logger.info(f"Totale eventi raccolti: {sum(len(eventi[s]) for s in ['football','basketball','tennis','volleyball'])}")
+    # le chiamate sono I/O-bound (il GIL e' rilasciato sul socket): un thread per sport, latenza totale ~max(latenze)
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=len(FETCHERS), thread_name_prefix='fetch') as ex:
+        results = await asyncio.gather(*(loop.run_in_executor(ex, fn, today) for _, fn in FETCHERS))
+    eventi: Dict[str, Any] = {sport: res for (sport, _), res in zip(FETCHERS, results)}
+    logger.info(f"Totale eventi raccolti: {sum(len(res) for res in results)}")
+    eventi['data_raccolta'] = today
     return eventi
 
 def analisi_dati(dati: Dict[str, Any]) -> Dict[str, Any]:
-    cands = build_event_candidates(dati)
-    for c in cands:
-        odds = c.get('odds') or 0; pen = 0.0
-        if odds and odds < 1.3: pen = 0.1
-        elif odds and odds > 5.0: pen = 0.05
-        c['confidence'] = round(max(0.0, c['confidence'] - pen), 3)
+    cands = build_event_candidates(dati)  # confidenza gia' penalizzata in base alla quota scelta
     return {'eventi_analizzati': len(cands), 'timestamp': datetime.now().isoformat(), 'predizioni': cands}
 
-def seleziona_giocate(analisi: Dict[str, Any]) -> List[Dict[str, Any]]:
-    preds = sorted(list(analisi.get('predizioni', [])), key=lambda x: x.get('confidence',0), reverse=True)
-    res: List[Dict[str, Any]] = []; counts: Dict[str,int] = {}
-    for p in preds:
-        s = p.get('sport','unknown')
-        if counts.get(s,0) >= 2 and len(res) < 3: continue
-        res.append(p); counts[s] = counts.get(s,0)+1
-        if len(res) == 3: break
-    return res
-
-def format_telegram_message(giocate: List[Dict[str, Any]], data_str: str) -> str:
+def seleziona_giocate(analisi: Dict[str, Any]) -> List[Candidate]:
+    # max 2 giocate per sport: un min-heap di 2 elementi per sport tiene le migliori in una sola passata,
+    # poi le 3 migliori tra queste. -i come spareggio mantiene l'ordine stabile a parita' di confidenza
+    best: Dict[str, List[Tuple[float, int, Candidate]]] = {}
+    for i, p in enumerate(analisi.get('predizioni', ())):
+        h = best.setdefault(p.sport, []); item = (p.confidence, -i, p)
+        if len(h) < 2: heapq.heappush(h, item)
+        elif item > h[0]: heapq.heapreplace(h, item)
+    return [p for _, _, p in heapq.nlargest(3, (x for h in best.values() for x in h))]
+
+PICK_TEMPLATE = "{i}) {sport} • {event}\n   Pick: {market} {pick} @ {odds}\n   Prob: {prob:.2f} • Conf: {conf:.2f}\n   Motivo: {rationale}"
+
+def format_telegram_message(giocate: List[Candidate], data_str: str) -> str:
     if not giocate: return f"📅 {data_str}\nNessuna giocata consigliata oggi."
-    lines = [f"📅 {data_str} - Top 3 giocate AI", ""]
-    for i,g in enumerate(giocate, start=1):
-        lines.append(f"{i}) {g['sport'].title()} • {g['event']}\n   Pick: {g['market']} {g['pick']} @ {g.get('odds','-')}\n   Prob: {g.get('prob',0):.2f} • Conf: {g.get('confidence',0):.2f}\n   Motivo: {g.get('rationale','-')}")
-    return "\n".join(lines)
+    body = "\n".join(PICK_TEMPLATE.format(i=i, sport=g.sport.title(), event=g.event, market=g.market, pick=g.pick, odds=g.odds, prob=g.prob, conf=g.confidence, rationale=g.rationale) for i, g in enumerate(giocate, start=1))
+    return f"📅 {data_str} - Top 3 giocate AI\n\n{body}"
 
-def invia_telegram(giocate: List[Dict[str, Any]], data_str: str) -> None:
+def invia_telegram(giocate: List[Candidate], data_str: str) -> None:
     if TELEGRAM_BOT_TOKEN.startswith('YOUR_') or TELEGRAM_CHAT_ID.startswith('YOUR_'):
         logger.warning("Telegram non configurato: salta invio."); return
     try:
-        bot = Bot(token=TELEGRAM_BOT_TOKEN)
         msg = format_telegram_message(giocate, data_str)
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=msg)
+        r = SESSION.post(f'{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage', json={'chat_id': TELEGRAM_CHAT_ID, 'text': msg}, timeout=10)
+        if not r.ok:
+            logger.error(f"Errore invio Telegram: HTTP {r.status_code} {r.text[:200]}"); return
         logger.info("Messaggio Telegram inviato")
     except Exception as e:
-        logger.error(f"Errore invio Telegram: {e}")
+        # il token fa parte dell'URL: non deve finire nei log
+        logger.error(f"Errore invio Telegram: {str(e).replace(TELEGRAM_BOT_TOKEN, '***')}")
 
-def processo_giornaliero():
+async def processo_giornaliero():
     try:
         logger.info("="*50); logger.info("Avvio processo giornaliero"); logger.info("="*50)
-        dati = raccolta_dati()
+        dati = await raccolta_dati()
         analisi = analisi_dati(dati)
         giocate = seleziona_giocate(analisi)
         invia_telegram(giocate, dati.get('data_raccolta', date.today().isoformat()))
@@ -187,17 +353,29 @@ def processo_giornaliero():
     except Exception as e:
         logger.error(f"Errore durante il processo giornaliero: {e}")
 
+async def cron_loop(hour: int = 10, minute: int = 0) -> None:
+    # un solo job giornaliero: basta dormire fino al prossimo orario, senza uno scheduler completo
+    while True:
+        now = datetime.now()
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now: target += timedelta(days=1)
+        # orario locale del giorno di destinazione: astimezone() ne risolve l'offset, cambio dell'ora legale incluso
+        target = target.astimezone()
+        logger.info(f"Prossima esecuzione: {target.isoformat(sep=' ', timespec='minutes')}")
+        # sonno a tratti ricontrollando l'orologio di sistema: niente deriva se l'host va in sospensione
+        while (remaining := (target - datetime.now().astimezone()).total_seconds()) > 0:
+            await asyncio.sleep(min(remaining, 300))
+        await processo_giornaliero()
+
 def main():
     logger.info("Avvio AI Sports Autobet Agent")
     if API_FOOTBALL_KEY == 'YOUR_API_FOOTBALL_KEY_HERE':
         logger.warning("ATTENZIONE: API Football key non configurata!")
-    scheduler = BlockingScheduler()
-    scheduler.add_job(processo_giornaliero, trigger=CronTrigger(hour=10, minute=0), id='processo_giornaliero', name='Processo giornaliero pronostici')
     logger.info("Scheduler configurato. In attesa di esecuzione...")
     try:
-        scheduler.start()
+        asyncio.run(cron_loop())
     except (KeyboardInterrupt, SystemExit):
-        logger.info("Shutdown richiesto. Arresto scheduler..."); scheduler.shutdown()
+        logger.info("Shutdown richiesto. Arresto scheduler...")
 
 if __name__ == '__main__':
     main()